@@ -0,0 +1,128 @@
+import os
+import sys
+import glob
+
+import cv2
+import numpy as np
+
+# Builds an INT8 TensorRT engine for ssd-mobilenet-v2 calibrated on frames
+# from the actual booth cameras. Run this once per Orin after the cameras are
+# mounted, then restart the sfvis service: initialize_model() picks up
+# ssd-mobilenet-v2-int8.engine automatically.
+#
+# Needs the tensorrt and pycuda Python packages (tensorrt ships with JetPack;
+# pycuda: pip3 install pycuda).
+#
+# Usage: python3 calibrate_int8.py [onnx_model_path]
+
+CALIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calib")
+CALIB_FRAMES = 500
+ENGINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ssd-mobilenet-v2-int8.engine")
+CACHE_PATH = os.path.join(CALIB_DIR, "calib.cache")
+INPUT_SHAPE = (3, 300, 300)
+
+
+def dump_calibration_frames(camera_id=0):
+    """Capture frames from the camera into calib/*.ppm for the calibrator."""
+    os.makedirs(CALIB_DIR, exist_ok=True)
+    existing = len(glob.glob(os.path.join(CALIB_DIR, "*.ppm")))
+    if existing >= CALIB_FRAMES:
+        print(f"{existing} calibration frames already present, skipping capture.")
+        return
+    cap = cv2.VideoCapture(camera_id)
+    if not cap.isOpened():
+        print(f"Error: Could not open camera {camera_id}.")
+        sys.exit(1)
+    saved = existing
+    while saved < CALIB_FRAMES:
+        ret, frame = cap.read()
+        if not ret:
+            continue
+        resized = cv2.resize(frame, (300, 300))
+        cv2.imwrite(os.path.join(CALIB_DIR, f"frame_{saved:04d}.ppm"), resized)
+        saved += 1
+        if saved % 50 == 0:
+            print(f"Captured {saved}/{CALIB_FRAMES} calibration frames")
+    cap.release()
+
+
+def build_engine(onnx_path):
+    """Build the INT8 engine, calibrating it on the dumped camera frames."""
+    import tensorrt as trt
+    import pycuda.autoinit  # noqa: F401  (creates the CUDA context)
+    import pycuda.driver as cuda
+
+    if not os.path.exists(onnx_path):
+        print(f"Error: ONNX model not found at {onnx_path}.")
+        print("Export it from jetson-inference's networks directory first.")
+        sys.exit(1)
+    frames = sorted(glob.glob(os.path.join(CALIB_DIR, "*.ppm")))
+    if not frames:
+        print(f"Error: no calibration frames in {CALIB_DIR}; run the capture step first.")
+        sys.exit(1)
+
+    class FrameCalibrator(trt.IInt8EntropyCalibrator2):
+        # Feeds the dumped frames one at a time (the ONNX export has a fixed
+        # batch of 1) through the same preprocessing detectNet applies to
+        # ONNX models: RGB, CHW, scaled to [-1, 1]
+        def __init__(self):
+            super().__init__()
+            self.index = 0
+            self.device_input = cuda.mem_alloc(int(np.prod(INPUT_SHAPE)) * 4)
+
+        def get_batch_size(self):
+            return 1
+
+        def get_batch(self, names):
+            if self.index >= len(frames):
+                return None
+            img = cv2.imread(frames[self.index])
+            self.index += 1
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32)
+            tensor = np.ascontiguousarray((img / 127.5 - 1.0).transpose(2, 0, 1))
+            cuda.memcpy_htod(self.device_input, tensor)
+            if self.index % 50 == 0:
+                print(f"Calibrated on {self.index}/{len(frames)} frames")
+            return [int(self.device_input)]
+
+        def read_calibration_cache(self):
+            if os.path.exists(CACHE_PATH):
+                print(f"Reusing calibration cache {CACHE_PATH}")
+                with open(CACHE_PATH, "rb") as f:
+                    return f.read()
+            return None
+
+        def write_calibration_cache(self, cache):
+            with open(CACHE_PATH, "wb") as f:
+                f.write(cache)
+            print(f"Calibration cache written to {CACHE_PATH}")
+
+    logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, logger)
+    with open(onnx_path, "rb") as f:
+        if not parser.parse(f.read()):
+            for i in range(parser.num_errors):
+                print(f"ONNX parse error: {parser.get_error(i)}")
+            sys.exit(1)
+
+    config = builder.create_builder_config()
+    config.max_workspace_size = 1 << 30
+    config.set_flag(trt.BuilderFlag.INT8)
+    config.set_flag(trt.BuilderFlag.FP16)  # fallback for layers INT8 can't run
+    config.int8_calibrator = FrameCalibrator()
+
+    engine = builder.build_serialized_network(network, config)
+    if engine is None:
+        print("Engine build failed; the FP16/stock engine will keep being used.")
+        sys.exit(1)
+    with open(ENGINE_PATH, "wb") as f:
+        f.write(engine)
+    print(f"INT8 engine written to {ENGINE_PATH}")
+
+
+if __name__ == "__main__":
+    onnx_model = sys.argv[1] if len(sys.argv) > 1 else "ssd_mobilenet_v2.onnx"
+    dump_calibration_frames()
+    build_engine(onnx_model)
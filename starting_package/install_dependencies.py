@@ -15,10 +15,10 @@ def install_packages():
     run_command("sudo apt update")
 
     # Install required system packages
-    run_command("sudo apt-get install -y v4l-utils python3-pip")
+    run_command("sudo apt-get install -y v4l-utils python3-pip libturbojpeg")
 
     # Install Python libraries (keep opencv-python even if it conflicts)
-    run_command("python3 -m pip install mysql-connector-python Flask opencv-python numpy")
+    run_command("python3 -m pip install mysql-connector-python Flask waitress opencv-python numpy PyTurboJPEG")
 
     # Get the current directory where the script is located
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -1,17 +1,43 @@
+import os
+import re
 import cv2
 import socket
+import numpy as np
 import jetson_inference
 import jetson_utils
 import mysql.connector
 from mysql.connector import Error
 from configparser import ConfigParser
 import time
+import queue
+import signal
 import subprocess
-from datetime import datetime, timedelta
+from datetime import datetime
 import threading
 from flask import Flask, Response
 from typing import List, Dict
 
+# JPEG encoder selection for the MJPEG endpoints: nvJPEG uses the Jetson's
+# dedicated JPEG block, TurboJPEG is the SIMD CPU fallback, cv2 the last resort
+try:
+    from nvjpeg import NvJpeg
+    nj = NvJpeg()
+except (ImportError, OSError) as e:
+    print(f"nvJPEG not available: {e}")
+    nj = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    tj = TurboJPEG()
+except (ImportError, OSError) as e:
+    print(f"TurboJPEG not available, falling back to cv2.imencode: {e}")
+    tj = None
+
+# Keep OpenCV off the thread pool: TBB otherwise fans imencode/videoconvert
+# work across every core and steals cycles from the detector's host-side work
+cv2.setNumThreads(1)
+cv2.ocl.setUseOpenCL(False)
+
 frame_rate = 40
 app = Flask(__name__)
 frame1 = None
@@ -19,6 +45,9 @@ frame2 = None
 camera_group: Dict[int, 'Camera'] = {}
 local: Dict[int, int] = {}
 hostname = socket.gethostname()
+stop_event = threading.Event()
+# Signaled by the capture threads when a new frame lands in frame1/frame2
+frame_events = [threading.Event(), threading.Event()]
 
 def read_db_config(filename='dbconfig.ini', section='database') -> Dict[str, str]:
     parser = ConfigParser(interpolation=None)  # Disable interpolation to allow % in password
@@ -34,10 +63,25 @@ def read_db_config(filename='dbconfig.ini', section='database') -> Dict[str, str
 
 db_config = read_db_config()
 
+# Persistent connection pool: opening a fresh TCP+auth session per publish
+# cost more than the INSERTs it carried
+db_pool = mysql.connector.pooling.MySQLConnectionPool(
+    pool_name="sfvis", pool_size=4, pool_reset_session=False, **db_config)
+
 class Camera:
+    # Slots instead of a per-instance __dict__: the main loop touches ~10 of
+    # these attributes per camera per frame, and slot access is a fixed
+    # offset read rather than a dict lookup
+    __slots__ = ('station', 'sfvis', 'previous_status', 'time_spent', 'status',
+                 'people_count', 'frame_rate', 'presence_total', 'presence_60',
+                 'presence_rate', 'ret', 'frame', 'cap', 'time_started',
+                 'first_time', 'cuda_img', 'detections',
+                 'jpeg', 'frame_q', 'last_transition',
+                 'next_regular', 'next_rollup')
+
     def __init__(self, station, sfvis, previous_status, time_spent, status, people_count,
                  frame_rate, presence_total, presence_60, presence_rate,
-                 ret, frame, cap, time_started, first_time, pause, checkpoint, cuda_img, detections):
+                 ret, frame, cap, time_started, first_time, cuda_img, detections):
         self.station = station
         self.sfvis = sfvis
         self.previous_status = previous_status
@@ -53,30 +97,44 @@ class Camera:
         self.cap = cap
         self.time_started = time_started
         self.first_time = first_time
-        self.pause = pause
-        self.checkpoint = checkpoint
         self.cuda_img = cuda_img
         self.detections = detections
         self.jpeg = None
+        self.last_transition = 0.0
+        # Monotonic deadlines for the periodic publish and the 60s presence
+        # rollover; armed in main() once the cameras are up
+        self.next_regular = 0.0
+        self.next_rollup = 0.0
+        # Hand-off slot from this camera's capture thread to the detector
+        # loop; maxsize=1 with drop-old keeps only the newest frame
+        self.frame_q = queue.Queue(maxsize=1)
+
+_DIGITS = re.compile(r'\d+')
 
 def findSFVISno(hostname: str) -> str:
-    import re
-    number_of_sfvis = re.search(r'\d+', hostname)
+    number_of_sfvis = _DIGITS.search(hostname)
     return number_of_sfvis.group() if number_of_sfvis else None
 
 def devices(camera_device: str) -> int:
-    import re
-    match = re.search(r'\d+', camera_device)
-    return int(match.group()) if match else None
+    # v4l2-ctl lines are always '/dev/videoN', so a plain split beats a regex
+    try:
+        return int(camera_device.rsplit('video', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+_camera_devices_cache: List[str] = None
 
 def get_camera_devices() -> List[str]:
+    # /dev/video* nodes don't change while the service runs, so fork v4l2-ctl
+    # once and serve the parsed list from cache afterwards
+    global _camera_devices_cache
+    if _camera_devices_cache is not None:
+        return _camera_devices_cache
     result = subprocess.run(['v4l2-ctl', '--list-devices'], capture_output=True, text=True)
     devices_list: List[str] = []
     if result.returncode == 0:
-        lines = result.stdout.split('\n')
-        for line in lines:
-            if '/dev/video' in line:
-                devices_list.append(line.strip())
+        devices_list = [line.strip() for line in result.stdout.split('\n') if '/dev/video' in line]
+    _camera_devices_cache = devices_list
     return devices_list
 
 def place_cameras() -> int:
@@ -92,6 +150,22 @@ def place_cameras() -> int:
     return camera_amount
 
 def initialize_camera(camera_id: int):
+    # Preferred path: GStreamer with nvvidconv so the VIC hardware block does
+    # the colorspace conversion instead of an ARM core, and drop=true
+    # max-buffers=1 discards stale frames at the source instead of queueing
+    pipeline = (
+        f"v4l2src device=/dev/video{camera_id} ! "
+        f"video/x-raw,width=1080,height=720,framerate={frame_rate}/1 ! "
+        "nvvidconv ! video/x-raw,format=BGRx ! videoconvert ! "
+        "video/x-raw,format=BGR ! appsink drop=true max-buffers=1"
+    )
+    cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+    if cap.isOpened():
+        print(f"Camera {camera_id} opened through GStreamer/nvvidconv.")
+        return cap
+
+    # Fallback: plain V4L2 capture (e.g. OpenCV built without GStreamer)
+    print(f"GStreamer pipeline failed for camera {camera_id}, using V4L2 directly.")
     cap = cv2.VideoCapture(camera_id)
     if not cap.isOpened():
         print(f"Error: Could not open camera {camera_id}.")
@@ -101,28 +175,113 @@ def initialize_camera(camera_id: int):
     cap.set(cv2.CAP_PROP_FPS, frame_rate)
     return cap
 
+def pin_to_core(core_id: int):
+    # Best effort: keeps a thread from migrating onto the detector's core
+    try:
+        os.sched_setaffinity(0, {core_id % os.cpu_count()})
+    except (AttributeError, OSError):
+        pass
+
+def capture_loop(cam: Camera, index: int):
+    # Per-camera producer: cap.read() blocks on V4L2, so it runs here instead
+    # of in the detector loop. Only the newest frame is kept.
+    global frame1, frame2
+    pin_to_core(1 + index)
+    while not stop_event.is_set():
+        ret, frame = cam.cap.read()
+        if not ret:
+            print(f"Error: Failed to read from camera {index+1}.")
+            time.sleep(0.1)
+            continue
+        if index == 0:
+            frame1 = frame
+        elif index == 1:
+            frame2 = frame
+        if index < len(frame_events):
+            frame_events[index].set()
+        try:
+            cam.frame_q.get_nowait()
+        except queue.Empty:
+            pass
+        cam.frame_q.put(frame)
+
 def initialize_model():
+    # Load a cached TensorRT FP16 engine when one sits next to the script
+    # (build once with: trtexec --onnx=ssd_mobilenet_v2.onnx --fp16
+    #  --workspace=1024 --saveEngine=ssd-mobilenet-v2-fp16.engine);
+    # FP16 roughly doubles detection throughput on the Orin
+    # INT8 (built with calibrate_int8.py) is preferred over FP16 when present
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    labels_path = os.path.join(script_dir, "ssd_coco_labels.txt")
+    for engine_name, precision in (("ssd-mobilenet-v2-int8.engine", "int8"),
+                                   ("ssd-mobilenet-v2-fp16.engine", "fp16")):
+        engine_path = os.path.join(script_dir, engine_name)
+        if os.path.exists(engine_path):
+            print(f"Loading TensorRT {precision.upper()} engine: {engine_path}")
+            return jetson_inference.detectNet(argv=[
+                f"--model={engine_path}",
+                f"--labels={labels_path}",
+                "--input-blob=input_0",
+                "--output-cvg=scores",
+                "--output-bbox=boxes",
+                f"--precision={precision}",
+                "--threshold=0.5",
+            ])
     return jetson_inference.detectNet("ssd-mobilenet-v2", threshold=0.5)
 
-def get_people_count(detections) -> int:
-    return sum(1 for det in detections if det.ClassID == 1 and det.Confidence > 0.60)
+def configure_person_filter(model):
+    # Best effort: raising the person cutoff inside detectNet drops
+    # low-confidence people early and disables the overlay. It does NOT
+    # replace the filter in get_people_count — other COCO classes still
+    # pass the global threshold and must be excluded when counting.
+    try:
+        model.SetClassThreshold("person", 0.60)
+        model.SetOverlayAlpha(0)
+        print("detectNet person threshold raised to 0.60")
+    except Exception as e:
+        print(f"Per-class threshold not supported by this jetson-inference: {e}")
 
-def generate_frame(frame):
-    while True:
-        if frame is not None:
-            ret, jpeg = cv2.imencode('.jpg', frame)
-            if ret:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n')
+def get_people_count(detections) -> int:
+    count = len(detections)
+    if count == 0:
+        return 0
+    class_ids = np.fromiter((det.ClassID for det in detections), dtype=np.int32, count=count)
+    confidences = np.fromiter((det.Confidence for det in detections), dtype=np.float32, count=count)
+    return int(((class_ids == 1) & (confidences > 0.60)).sum())
+
+def encode_jpeg(frame) -> bytes:
+    if nj is not None:
+        return nj.encode(frame, 80)
+    if tj is not None:
+        return tj.encode(frame, quality=80, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+    ret, jpeg = cv2.imencode('.jpg', frame)
+    return jpeg.tobytes() if ret else None
+
+def generate_frame(index: int):
+    # Blocks on the capture thread's frame-ready event instead of spinning,
+    # and re-reads the global each time (the old version captured the frame
+    # argument once and streamed the same stale image forever)
+    event = frame_events[index]
+    while not stop_event.is_set():
+        if not event.wait(timeout=1.0):
+            continue
+        event.clear()
+        frame = frame1 if index == 0 else frame2
+        if frame is None:
+            continue
+        jpeg_bytes = encode_jpeg(frame)
+        if jpeg_bytes is not None:
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n\r\n')
 
 @app.route('/camera1')
 def camera1_feed():
-    return Response(generate_frame(frame1),
+    return Response(generate_frame(0),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/camera2')
 def camera2_feed():
-    return Response(generate_frame(frame2),
+    return Response(generate_frame(1),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 def get_workstation(sfvis: str, camera_place: int) -> int:
@@ -136,11 +295,12 @@ def get_workstation_status(people_count: int) -> str:
     return "Occupied" if people_count != 0 else "Vacant"
 
 def get_formatted_time(elapsed_seconds: float) -> str:
-    elapsed_time = timedelta(seconds=elapsed_seconds)
-    formatted_time = str(elapsed_time)
-    if len(formatted_time.split(":")) == 2:
-        formatted_time = "00:" + formatted_time
-    return formatted_time
+    # Direct arithmetic instead of timedelta + str fix-ups; keeps the
+    # fractional seconds the TIME(6) column stores
+    hours = int(elapsed_seconds // 3600)
+    minutes = int((elapsed_seconds % 3600) // 60)
+    seconds = elapsed_seconds - hours * 3600 - minutes * 60
+    return f"{hours:02d}:{minutes:02d}:{seconds:09.6f}"
 
 def get_working_time(start: float) -> str:
     elapsed_t = time.time() - start
@@ -151,8 +311,13 @@ def create_table(sfvis: str, station: int):
     try:
         connection = mysql.connector.connect(**db_config)
         cursor = connection.cursor()
+        # The cam table is a fixed 10-slot ring: `slot` is the primary key and
+        # inserts rotate through it with ON DUPLICATE KEY UPDATE, so the table
+        # can never grow and no DELETE traffic is needed. Existing deployments
+        # with the old schema need a one-time DROP TABLE to pick this up.
         create_table_cam_query = f"""
         CREATE TABLE IF NOT EXISTS `sfvis_cam{station}` (
+            `slot` TINYINT NOT NULL PRIMARY KEY,
             `Timestamp` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             `Workstation_Camera` INT NOT NULL,
             `Vision_System` INT NOT NULL,
@@ -193,106 +358,162 @@ def create_table(sfvis: str, station: int):
             connection.close()
             print("MySQL connection is closed")
 
-def delete_oldest_record(cursor, connection, station: int):
-    count_query = f"SELECT COUNT(*) FROM sfvis_cam{station}"
-    cursor.execute(count_query)
-    row_count = cursor.fetchone()[0]
-    try:
-        if row_count > 10:
-            delete_query = f"""
-            DELETE FROM sfvis_cam{station}
-            WHERE Timestamp = (
-                SELECT Timestamp FROM (
-                    SELECT Timestamp FROM sfvis_cam{station} ORDER BY Timestamp ASC LIMIT 1
-                ) AS subquery
-            )
-            """
-            cursor.execute(delete_query)
-            connection.commit()
-            print(f"Oldest record deleted from sfvis_cam{station}.")
-    except Error as e:
-        print(f"Error deleting record from sfvis_cam{station}: {e}")
-        connection.rollback()
+# Ring-buffer slot rotation for the cam tables: each insert lands on the
+# next slot mod CAM_SLOTS, overwriting the oldest row in place, so the
+# storage engine caps the table at CAM_SLOTS rows with no pruning at all
+CAM_SLOTS = 10
+_cam_slot: Dict[int, int] = {}
+
+# Queue feeding the single writer thread; bounded so bursts of status
+# changes can never pile up unbounded threads or memory
+db_queue: 'queue.Queue' = queue.Queue(maxsize=1000)
 
 def publish_to_mysql(people_count: int, station: int, time_spent: str, status: str,
                      previous_status: str, sfvis: str, presence_rate: int, presence_total: int):
-    def publish():
-        connection = None
+    # Timestamp is taken at enqueue time so batching doesn't skew the data
+    row = (datetime.now(), people_count, station, time_spent, status,
+           previous_status, sfvis, presence_rate, presence_total)
+    try:
+        db_queue.put_nowait(row)
+    except queue.Full:
+        print("DB queue full; dropping oldest pending row")
         try:
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor()
-            timestamp = datetime.now()
-
-            # Determine table fields for time_spent
-            if time_spent:
-                time_field = "Period_Status_Last, "
-                time_placeholder = "%s, "
-                data = (timestamp, station, sfvis, previous_status, time_spent, status,
-                        people_count, frame_rate, presence_total, presence_rate)
-            else:
-                time_field = ""
-                time_placeholder = ""
-                data = (timestamp, station, sfvis, previous_status, status,
-                        people_count, frame_rate, presence_total, presence_rate)
-
-            base_query = (
-                f"INSERT INTO {{table}} "
-                f"(Timestamp, Workstation_Camera, Vision_System, Old_Status, {time_field}New_Status, "
-                f"People_Count, Frame_Rate, Presence_Change_Total, Presence_Change_Rate) "
-                f"VALUES (%s, %s, %s, %s, {time_placeholder}%s, %s, %s, %s, %s)"
-            )
-
-            query_sfvis = base_query.format(table=f"sfvis{sfvis}", time_field=time_field, time_placeholder=time_placeholder)
-            query_cam = base_query.format(table=f"sfvis_cam{station}", time_field=time_field, time_placeholder=time_placeholder)
-
-            cursor.execute(query_sfvis, data)
-            cursor.execute(query_cam, data)
-            connection.commit()
-            print(f"Published to MySQL: {people_count} people at Cam{station}")
+            db_queue.get_nowait()
+        except queue.Empty:
+            pass
+        db_queue.put_nowait(row)
+
+# One fixed 10-column statement shape per table; Period_Status_Last is sent
+# as NULL when there is no duration, so the server caches a single plan
+INSERT_SQL = (
+    "INSERT INTO {table} "
+    "(Timestamp, Workstation_Camera, Vision_System, Old_Status, Period_Status_Last, New_Status, "
+    "People_Count, Frame_Rate, Presence_Change_Total, Presence_Change_Rate) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+# Cam-table variant with the leading ring slot; the ON DUPLICATE KEY UPDATE
+# overwrites whatever the slot held before
+INSERT_CAM_SQL = (
+    "INSERT INTO {table} "
+    "(slot, Timestamp, Workstation_Camera, Vision_System, Old_Status, Period_Status_Last, New_Status, "
+    "People_Count, Frame_Rate, Presence_Change_Total, Presence_Change_Rate) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE Timestamp=VALUES(Timestamp), Workstation_Camera=VALUES(Workstation_Camera), "
+    "Vision_System=VALUES(Vision_System), Old_Status=VALUES(Old_Status), "
+    "Period_Status_Last=VALUES(Period_Status_Last), New_Status=VALUES(New_Status), "
+    "People_Count=VALUES(People_Count), Frame_Rate=VALUES(Frame_Rate), "
+    "Presence_Change_Total=VALUES(Presence_Change_Total), Presence_Change_Rate=VALUES(Presence_Change_Rate)"
+)
+_statements: Dict[tuple, tuple] = {}
+
+def get_statements(station: int, sfvis: str) -> tuple:
+    key = (station, sfvis)
+    if key not in _statements:
+        _statements[key] = (INSERT_SQL.format(table=f"sfvis{sfvis}"),
+                            INSERT_CAM_SQL.format(table=f"sfvis_cam{station}"))
+    return _statements[key]
+
+def db_writer():
+    # The writer keeps one pooled connection and one prepared cursor for its
+    # whole lifetime; both are rebuilt only after a database error
+    connection = None
+    cursor = None
+    while True:
+        # Block for the first row, then drain whatever else arrived so a
+        # burst becomes one executemany round-trip instead of N
+        rows = [db_queue.get()]
+        try:
+            while len(rows) < 64:
+                rows.append(db_queue.get(timeout=0.2))
+        except queue.Empty:
+            pass
 
-            delete_oldest_record(cursor, connection, station)
+        try:
+            if connection is None or not connection.is_connected():
+                connection = db_pool.get_connection()
+                cursor = connection.cursor(prepared=True)
+
+            batches: Dict[tuple, list] = {}
+            for (timestamp, people_count, station, time_spent, status,
+                 previous_status, sfvis, presence_rate, presence_total) in rows:
+                data = (timestamp, station, sfvis, previous_status, time_spent or None, status,
+                        people_count, frame_rate, presence_total, presence_rate)
+                batches.setdefault((station, sfvis), []).append(data)
+
+            for (station, sfvis), batch in batches.items():
+                query_sfvis, query_cam = get_statements(station, sfvis)
+                cursor.executemany(query_sfvis, batch)
+                # Rotate each cam row onto the next ring slot
+                slot = _cam_slot.get(station, 0)
+                cam_batch = []
+                for data in batch:
+                    cam_batch.append((slot,) + data)
+                    slot = (slot + 1) % CAM_SLOTS
+                _cam_slot[station] = slot
+                cursor.executemany(query_cam, cam_batch)
+                connection.commit()
+                print(f"Published {len(batch)} row(s) to MySQL for Cam{station}")
 
         except Error as e:
             print(f"Database error: {e}")
-        finally:
-            if connection and connection.is_connected():
-                cursor.close()
-                connection.close()
-    threading.Thread(target=publish).start()
+            try:
+                if connection:
+                    connection.close()
+            except Error:
+                pass
+            connection = None
+            cursor = None
 
 def check_status(camera: Camera):
-    if camera.status != camera.previous_status:
-        if camera.status == "Occupied" and camera.previous_status == "Vacant":
-            camera.time_started = time.time()
-            publish_to_mysql(camera.people_count, camera.station, camera.time_spent,
-                             camera.status, camera.previous_status, camera.sfvis,
-                             camera.presence_rate, camera.presence_total)
-            time.sleep(0.5)
-            camera.previous_status = "Occupied"
-        elif camera.status == "Vacant" and camera.previous_status == "Occupied":
-            camera.presence_rate += 1
-            camera.time_spent = get_working_time(camera.time_started)
-            publish_to_mysql(camera.people_count, camera.station, camera.time_spent,
-                             camera.status, camera.previous_status, camera.sfvis,
-                             camera.presence_rate, camera.presence_total)
-            time.sleep(0.5)
-            camera.previous_status = "Vacant"
-            camera.time_started = None
-            camera.time_spent = None
-
-def regular_post(camera: Camera, check_time: int):
-    if check_time % 60 == 0:
+    if camera.status == camera.previous_status:
+        return
+    # Debounce without stalling the loop: the old time.sleep(0.5) froze both
+    # cameras for half a second on every transition. Flaps inside the window
+    # are simply ignored; publishing is already async via the writer queue.
+    now = time.time()
+    if now - camera.last_transition < 0.5:
+        return
+    if camera.status == "Occupied" and camera.previous_status == "Vacant":
+        camera.time_started = now
+        publish_to_mysql(camera.people_count, camera.station, camera.time_spent,
+                         camera.status, camera.previous_status, camera.sfvis,
+                         camera.presence_rate, camera.presence_total)
+        camera.previous_status = "Occupied"
+    elif camera.status == "Vacant" and camera.previous_status == "Occupied":
+        camera.presence_rate += 1
+        camera.time_spent = get_working_time(camera.time_started)
+        publish_to_mysql(camera.people_count, camera.station, camera.time_spent,
+                         camera.status, camera.previous_status, camera.sfvis,
+                         camera.presence_rate, camera.presence_total)
+        camera.previous_status = "Vacant"
+        camera.time_started = None
+        camera.time_spent = None
+    camera.last_transition = now
+
+def regular_post(camera: Camera, rollover: bool):
+    if rollover:
         camera.presence_total += camera.presence_rate
         camera.presence_60 = camera.presence_rate
         camera.presence_rate = 0
     publish_to_mysql(camera.people_count, camera.station, None, camera.status,
                      camera.previous_status, camera.sfvis,
                      camera.presence_60, camera.presence_total)
-    camera.pause = True
+
+def run_http_server():
+    # waitress gives each MJPEG viewer its own worker thread; the Werkzeug
+    # dev server is single-threaded, so a second viewer stalled the first
+    # and every yield went through its debug plumbing
+    try:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=5000, threads=4)
+    except ImportError:
+        print("waitress not installed, falling back to the Flask dev server")
+        app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
 
 def main():
     sfvis = findSFVISno(hostname)
     model = initialize_model()
+    configure_person_filter(model)
     global frame1, frame2
 
     camera_amount = place_cameras()
@@ -307,46 +528,79 @@ def main():
                 continue
             camera_group[i] = Camera(
                 get_workstation(sfvis, i+1), sfvis, "Vacant", None, "Vacant", 0,
-                frame_rate, 0, 0, 0, None, None, cap, None, True, False, None, None, None
+                frame_rate, 0, 0, 0, None, None, cap, None, True, None, None
             )
             create_table(sfvis, camera_group[i].station)
     except Error as e:
         print(f"Error during camera setup: {e}")
 
-    threading.Thread(target=lambda: app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)).start()
+    threading.Thread(target=run_http_server, daemon=True).start()
+    threading.Thread(target=db_writer, daemon=True).start()
 
-    overall_time = time.time()
+    # Headless service: stop on SIGINT/SIGTERM instead of polling cv2.waitKey,
+    # which pumps the HighGUI event loop for ~1ms per iteration with no window
+    def handle_stop(signum, frame):
+        print(f"Signal {signum} received, stopping...")
+        stop_event.set()
+    signal.signal(signal.SIGINT, handle_stop)
+    signal.signal(signal.SIGTERM, handle_stop)
 
-    while True:
+    # Pre-warm the pool so the first status changes don't pay the handshake
+    warm = [db_pool.get_connection() for _ in range(4)]
+    for conn in warm:
+        conn.close()
+
+    for i in range(camera_amount):
+        threading.Thread(target=capture_loop, args=(camera_group[i], i), daemon=True).start()
+
+    # Arm the periodic-publish deadlines; monotonic time is immune to NTP or
+    # wall-clock jumps
+    start = time.monotonic()
+    for i in range(camera_amount):
+        camera_group[i].next_regular = start + 20
+        camera_group[i].next_rollup = start + 60
+
+    # Detector loop stays on core 0, away from the capture threads
+    pin_to_core(0)
+
+    # Hoist the bound methods the loop calls every frame; each saves an
+    # attribute lookup per camera per iteration
+    detect = model.Detect
+    cuda_to_numpy = jetson_utils.cudaToNumpy
+
+    while not stop_event.is_set():
         for i in range(camera_amount):
             cam = camera_group[i]
-            ret, frame = cam.cap.read()
-            if not ret:
-                print(f"Error: Failed to read from camera {i+1}.")
+            try:
+                frame = cam.frame_q.get(timeout=1.0)
+            except queue.Empty:
                 continue
-            if i == 0:
-                frame1 = frame
-            elif i == 1:
-                frame2 = frame
-            cam.ret, cam.frame = ret, frame
-            cam.cuda_img = jetson_utils.cudaFromNumpy(cam.frame)
-            cam.detections = model.Detect(cam.cuda_img)
+            cam.ret, cam.frame = True, frame
+            # Reuse one mapped CUDA buffer per camera: host and GPU share DRAM
+            # on Jetson, so writing into the mapping replaces the per-frame
+            # allocation + 2.3MB memcpy that cudaFromNumpy did
+            if cam.cuda_img is None:
+                cam.cuda_img = jetson_utils.cudaAllocMapped(
+                    width=frame.shape[1], height=frame.shape[0], format='bgr8')
+            np.copyto(cuda_to_numpy(cam.cuda_img), frame)
+            # One Detect per camera: the Python detectNet binding takes a
+            # single cudaImage and has no batched entry point, so a
+            # batch-size-2 engine can't be driven from here. The calls run
+            # back-to-back so the second launch queues immediately.
+            cam.detections = detect(cam.cuda_img)
             cam.people_count = get_people_count(cam.detections)
             cam.status = get_workstation_status(cam.people_count)
             check_status(cam)
-            cam.check_time = int(time.time() - overall_time)
-            if not cam.pause:
-                if cam.check_time % 20 == 0:
-                    cam.checkpoint = time.time()
-                    regular_post(cam, cam.check_time)
-            if cam.checkpoint is not None:
-                testing = time.time() - cam.checkpoint
-                if testing >= 1.0:
-                    cam.pause = False
-                    cam.checkpoint = None
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            # Deadline scheduler: fires exactly once per 20s period instead of
+            # the old `int(elapsed) % 20 == 0` check, which matched for a full
+            # second and needed the pause/checkpoint workaround to dedupe
+            now = time.monotonic()
+            if now >= cam.next_regular:
+                rollover = now >= cam.next_rollup
+                if rollover:
+                    cam.next_rollup += 60
+                regular_post(cam, rollover)
+                cam.next_regular += 20
 
     for i in range(camera_amount):
         camera_group[i].cap.release()
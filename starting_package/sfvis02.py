@@ -1,10 +1,12 @@
 import os
+import re
 import cv2
 import socket
+import numpy as np
 import threading
 import time
 import subprocess
-from datetime import datetime, timedelta
+from datetime import datetime
 from configparser import ConfigParser
 from flask import Flask, Response
 import jetson_inference
@@ -51,11 +53,17 @@ class Camera:
         self.presence_rate = 0
         self.pause = False
         self.checkpoint = None
+        # Last encoded JPEG plus a ready event: the main loop detects and
+        # encodes once per frame, stream clients only read the result
+        self.last_jpeg = None
+        self.frame_event = threading.Event()
 
 # ---------------- UTILITIES ---------------- #
+_DIGITS = re.compile(r'\d+')
+_VIDEO_DEV = re.compile(r'/dev/video(\d+)')
+
 def findSFVISno(hostname):
-    import re
-    m = re.search(r'\d+', hostname)
+    m = _DIGITS.search(hostname)
     return m.group() if m else None
 
 def get_camera_devices():
@@ -63,8 +71,9 @@ def get_camera_devices():
     devices = []
     if result.returncode == 0:
         for line in result.stdout.splitlines():
-            if '/dev/video' in line:
-                devices.append(int(''.join(filter(str.isdigit, line))))
+            m = _VIDEO_DEV.search(line)
+            if m:
+                devices.append(int(m.group(1)))
     return devices
 
 def initialize_camera(camera_id):
@@ -78,6 +87,24 @@ def initialize_camera(camera_id):
     return cap
 
 def initialize_model():
+    # Same cached TensorRT FP16 engine convention as sfvis.py: drop a
+    # trtexec-built engine next to the script to roughly double throughput
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    labels_path = os.path.join(script_dir, "ssd_coco_labels.txt")
+    for engine_name, precision in (("ssd-mobilenet-v2-int8.engine", "int8"),
+                                   ("ssd-mobilenet-v2-fp16.engine", "fp16")):
+        engine_path = os.path.join(script_dir, engine_name)
+        if os.path.exists(engine_path):
+            print(f"Loading TensorRT {precision.upper()} engine: {engine_path}")
+            return jetson_inference.detectNet(argv=[
+                f"--model={engine_path}",
+                f"--labels={labels_path}",
+                "--input-blob=input_0",
+                "--output-cvg=scores",
+                "--output-bbox=boxes",
+                f"--precision={precision}",
+                "--threshold=0.5",
+            ])
     return jetson_inference.detectNet("ssd-mobilenet-v2", threshold=0.5)
 
 def get_people_count(detections):
@@ -90,11 +117,11 @@ def get_workstation_status(people_count):
     return "Occupied" if people_count else "Vacant"
 
 def get_formatted_time(elapsed_seconds):
-    t = timedelta(seconds=elapsed_seconds)
-    s = str(t)
-    if len(s.split(':')) == 2:
-        s = "00:" + s
-    return s
+    # Same direct arithmetic as sfvis.py; no timedelta allocation
+    hours = int(elapsed_seconds // 3600)
+    minutes = int((elapsed_seconds % 3600) // 60)
+    seconds = elapsed_seconds - hours * 3600 - minutes * 60
+    return f"{hours:02d}:{minutes:02d}:{seconds:09.6f}"
 
 def get_working_time(start):
     return get_formatted_time(time.time() - start)
@@ -190,16 +217,15 @@ def publish_to_mysql(cam: Camera, db_config):
 
 # ---------------- FLASK STREAMING ---------------- #
 def generate_camera_feed(cam_id):
+    # Serves the JPEG the main loop already produced; no second model.Detect
+    # per connected client, and the event wait replaces the busy loop
     cam = camera_group[cam_id]
     while True:
-        if cam.frame is not None:
-            cam.cuda_img = jetson_utils.cudaFromNumpy(cam.frame)
-            cam.detections = cam.model.Detect(cam.cuda_img)
-            jetson_utils.cudaDeviceSynchronize()
-            frame = jetson_utils.cudaToNumpy(cam.cuda_img)
-            ret, jpeg = cv2.imencode('.jpg', frame)
-            if ret:
-                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n')
+        if not cam.frame_event.wait(timeout=1.0):
+            continue
+        cam.frame_event.clear()
+        if cam.last_jpeg is not None:
+            yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + cam.last_jpeg + b'\r\n\r\n')
 
 def create_camera_routes():
     for cam_id in camera_group.keys():
@@ -245,9 +271,22 @@ def main():
             ret, frame = cam.cap.read()
             if ret:
                 cam.frame = frame
-                cam.people_count = get_people_count(cam.model.Detect(jetson_utils.cudaFromNumpy(frame)))
+                # Single inference per frame, into the persistent mapped buffer
+                if cam.cuda_img is None:
+                    cam.cuda_img = jetson_utils.cudaAllocMapped(
+                        width=frame.shape[1], height=frame.shape[0], format='bgr8')
+                np.copyto(jetson_utils.cudaToNumpy(cam.cuda_img), frame)
+                cam.detections = cam.model.Detect(cam.cuda_img)
+                cam.people_count = get_people_count(cam.detections)
                 cam.status = get_workstation_status(cam.people_count)
                 check_status(cam)
+                # Encode the annotated frame once and wake streaming clients
+                jetson_utils.cudaDeviceSynchronize()
+                annotated = jetson_utils.cudaToNumpy(cam.cuda_img)
+                ok, jpeg = cv2.imencode('.jpg', annotated)
+                if ok:
+                    cam.last_jpeg = jpeg.tobytes()
+                    cam.frame_event.set()
         time.sleep(1/frame_rate)
 
 if __name__ == "__main__":
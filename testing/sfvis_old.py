@@ -1,21 +1,54 @@
+import os
 import cv2
 import socket
+import numpy as np
 import jetson.inference
 import jetson.utils
 import mysql.connector
 from mysql.connector import Error
 from configparser import ConfigParser
 import time
+import queue
 import getpass
-from datetime import datetime, timedelta
+from datetime import datetime
 import threading
 from flask import Flask, Response
 
+# Numba compiles the per-detection counting kernel to native code when it is
+# installed; otherwise the NumPy reduction below is used as-is
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# nvJPEG runs the DCT/Huffman stages on the Jetson GPU and only copies the
+# compressed bytestream back to host, so prefer it over any CPU encoder
+try:
+    from nvjpeg import NvJpeg
+    nj = NvJpeg()
+except (ImportError, OSError) as e:
+    print(f"nvJPEG not available: {e}")
+    nj = None
+
+# TurboJPEG (libjpeg-turbo) encodes ~4-5x faster than cv2.imencode for MJPEG
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    tj = TurboJPEG()
+except (ImportError, OSError) as e:
+    print(f"TurboJPEG not available, falling back to cv2.imencode: {e}")
+    tj = None
+
 frame_rate = 40
 app = Flask(__name__)
 frame1 = None
 frame2 = None
 
+# Latest encoded JPEG per camera plus an event the capture threads signal on
+# every new frame: each frame is encoded exactly once no matter how many
+# browser clients are attached, and idle generators sleep on the event
+latest_jpeg = [None, None]
+jpeg_events = [threading.Event(), threading.Event()]
+
 # Get machine's hostname
 hostname = socket.gethostname()
 
@@ -47,6 +80,14 @@ def db_details():
 
 db_config = db_details()
 
+# Persistent connection pool: the TCP + auth handshake on every publish used
+# to cost more than the INSERT itself, so connections are reused instead
+db_pool = mysql.connector.pooling.MySQLConnectionPool(
+    pool_name="sfvis_pool", pool_size=4, **db_config)
+
+# Cache of formatted INSERT statements per (sfvis, station, has time_spent)
+query_cache = {}
+
 # Collects hostname and returns only its integer unique identification
 def findSFVISno (hostname):
     import re
@@ -60,51 +101,103 @@ def initialize_camera(camera_id):
         print(f"Error: Could not open the camera {camera_id}.")
         return None
     
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1080)  
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    # Ask the camera for MJPG so it compresses on-board; uncompressed YUYV at
+    # 40fps saturates the USB bus long before the requested frame rate
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    # 640x480 is plenty for both the MJPEG preview and SSD-MobileNet, which
+    # resizes its input down to 300x300 anyway; full 1080x720 frames only
+    # burned USB bandwidth and CUDA upload time
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
     cap.set(cv2.CAP_PROP_FPS, frame_rate)  # Lower frame rate to reduce load
-    
+
     return cap
 
 # Initialize the Jetson Inference object detection model
+# Prefers, in order:
+#   1. ssd-mobilenet-v2-best.engine — shape-frozen engine built with
+#      trtexec --onnx=ssd-mobilenet-v2.onnx --best --shapes=input_0:1x3x300x300
+#      --tacticSources=+CUBLAS,+CUBLAS_LT --saveEngine=ssd-mobilenet-v2-best.engine
+#   2. ssd-mobilenet-v2-fp16.engine — plain FP16 engine (trtexec --fp16)
+#   3. the stock ssd-mobilenet-v2 network
 def initialize_model():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    labels_path = os.path.join(script_dir, "ssd_coco_labels.txt")
+    for engine_name in ("ssd-mobilenet-v2-best.engine", "ssd-mobilenet-v2-fp16.engine"):
+        engine_path = os.path.join(script_dir, engine_name)
+        if os.path.exists(engine_path):
+            print(f"Loading TensorRT engine: {engine_path}")
+            return jetson.inference.detectNet(argv=[
+                f"--model={engine_path}",
+                f"--labels={labels_path}",
+                "--input-blob=input_0",
+                "--output-cvg=scores",
+                "--output-bbox=boxes",
+                "--precision=fp16",
+                "--threshold=0.5",
+            ])
     return jetson.inference.detectNet("ssd-mobilenet-v2", threshold=0.5)
 
+# Compiled counting kernel: releases the GIL and runs as native code once
+# Numba has cached the compilation, so the capture/encode threads keep running
+# while it executes
+def _count_people_kernel(class_ids, confidences):
+    people = 0
+    for i in range(class_ids.shape[0]):
+        if class_ids[i] == 1 and confidences[i] > 0.60:
+            people += 1
+    return people
+
+if njit is not None:
+    _count_people_kernel = njit(cache=True, nogil=True)(_count_people_kernel)
+
 # Function to count the number of people detected
+# ClassID 1 is 'person'; only detections above 60% confidence are counted.
+# Pulls ClassID/Confidence into two NumPy arrays in one pass so the filter
+# runs as a vectorized reduction instead of per-detection Python attribute hops
 def get_people_count(detections):
-    people_count = sum(1 for detection in detections if detection.ClassID == 1 and detection.Confidence > 0.60)  # ClassID 1 is for 'person' and check if confidence level is bigger than 60%
-    return people_count
-    
-# Function to generate frames for Camera 1
-def generate_camera_1():
-    global frame1
+    count = len(detections)
+    if count == 0:
+        return 0
+    class_ids = np.fromiter((d.ClassID for d in detections), dtype=np.int32, count=count)
+    confidences = np.fromiter((d.Confidence for d in detections), dtype=np.float32, count=count)
+    if njit is not None:
+        return int(_count_people_kernel(class_ids, confidences))
+    return int(((class_ids == 1) & (confidences > 0.60)).sum())
+
+# Method to encode one frame to JPEG bytes (nvJPEG on GPU if present,
+# then TurboJPEG, then cv2 as the last resort)
+def encode_jpeg(frame):
+    if nj is not None:
+        return nj.encode(frame, 80)
+    if tj is not None:
+        return tj.encode(frame, quality=80, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+    ret, jpeg = cv2.imencode('.jpg', frame)
+    return jpeg.tobytes() if ret else None
+
+# Function to generate frames for one camera: blocks on the frame-ready event
+# and serves the JPEG the capture thread already encoded, instead of
+# re-encoding per client in a busy loop
+def generate_camera(index):
+    event = jpeg_events[index]
     while True:
-        if frame1 is not None:
-            ret, jpeg = cv2.imencode('.jpg', frame1)
-            if ret:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n')
-
-# Function to generate frames for Camera 2
-def generate_camera_2():
-    global frame2
-    while True:
-        if frame2 is not None:
-            ret, jpeg = cv2.imencode('.jpg', frame2)
-            if ret:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n')
+        event.wait()
+        event.clear()
+        jpeg_bytes = latest_jpeg[index]
+        if jpeg_bytes is not None:
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n\r\n')
 
 # Flask route for Camera 1 feed
 @app.route('/camera1')
 def camera1_feed():
-    return Response(generate_camera_1(),
+    return Response(generate_camera(0),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 # Flask route for Camera 2 feed
 @app.route('/camera2')
 def camera2_feed():
-    return Response(generate_camera_2(),
+    return Response(generate_camera(1),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 # Method to get the workstation info
@@ -125,15 +218,31 @@ def get_workstation_status(people_count):
     return status
 
 # Method to format time to HH:MM:SS format
+# Plain integer divmod instead of building a timedelta and fixing up its
+# string form; same output, no per-event allocations
 def get_formatted_time(elapsed_seconds):
-    elapsed_time = timedelta(seconds=elapsed_seconds)
-    
-    formatted_time = str(elapsed_time)
-    
-    if len(formatted_time.split(":")) == 2:
-        formatted_time = "00:" + formatted_time
-        
-    return formatted_time
+    hours, remainder = divmod(int(elapsed_seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+# Capture thread for one camera: cap.read() blocks on V4L2 waiting for the
+# next frame, so each camera gets its own reader that keeps only the latest
+# frame in the shared global. The inference loop then never waits on I/O.
+def capture_loop(cap, camera_number):
+    global frame1, frame2
+    while True:
+        ret, frm = cap.read()
+        if not ret:
+            print(f"Error: Failed to read from the camera {camera_number}.")
+            time.sleep(0.1)
+            continue
+        if camera_number == 1:
+            frame1 = frm
+        else:
+            frame2 = frm
+        # Encode once per captured frame and wake any streaming clients
+        latest_jpeg[camera_number - 1] = encode_jpeg(frm)
+        jpeg_events[camera_number - 1].set()
 
 # Method to get the time one person spent working at welding booth
 def get_working_time(start):
@@ -160,7 +269,8 @@ def create_table(sfvis, station):
             `People_Count` INT NOT NULL,
             `Frame_Rate` INT NOT NULL,
             `Presence_Change_Total` INT NOT NULL,
-            `Presence_Change_Rate` INT NOT NULL
+            `Presence_Change_Rate` INT NOT NULL,
+            INDEX `idx_timestamp` (`Timestamp`)
         )
         """
         cursor.execute(create_table_cam1_query)
@@ -193,96 +303,146 @@ def create_table(sfvis, station):
             connection.close()
             print("MySQL connection is closed")
 
-# Function to delete oldest item of the Grafana on the MySQL
-def delete_function(cursor, connection, station):
-    count_query = f"SELECT COUNT(*) FROM sfvis_cam{str(station)};"
-    cursor.execute(count_query)
-    row_count = cursor.fetchone()[0]
+# Prune bookkeeping: the COUNT+DELETE round-trips only run every
+# PRUNE_EVERY_INSERTS rows (or PRUNE_EVERY_SECONDS at the latest) per station
+# instead of after every single publish
+PRUNE_EVERY_INSERTS = 100
+PRUNE_EVERY_SECONDS = 300
+prune_counters = {}
+prune_last_run = {}
+
+# Function to delete oldest items of the Grafana on the MySQL
+def delete_function(cursor, connection, station, inserted=1):
+    prune_counters[station] = prune_counters.get(station, 0) + inserted
+    now = time.time()
+    if (prune_counters[station] < PRUNE_EVERY_INSERTS
+            and now - prune_last_run.get(station, 0) < PRUNE_EVERY_SECONDS):
+        return
+    prune_counters[station] = 0
+    prune_last_run[station] = now
 
     try:
+        count_query = f"SELECT COUNT(*) FROM sfvis_cam{str(station)};"
+        cursor.execute(count_query)
+        row_count = cursor.fetchone()[0]
+
         if row_count > 10:
-            delete_query = f"""
-                DELETE FROM sfvis_cam{station}
-                WHERE Timestamp = (
-                    SELECT Timestamp
-                    FROM (
-                        SELECT Timestamp
-                        FROM sfvis_cam{station}
-                        ORDER BY Timestamp ASC
-                        LIMIT 1
-                    ) AS subquery
-                );
-                """
-            print()
-            cursor.execute(delete_query)  #multi=True here
+            # Single windowed delete; MySQL turns ORDER BY + LIMIT into an
+            # index-range delete on the Timestamp index
+            delete_query = f"DELETE FROM sfvis_cam{station} ORDER BY Timestamp ASC LIMIT {row_count - 10}"
+            cursor.execute(delete_query)
             connection.commit()
-            print(f"Oldest record deleted from sfvis_cam{station}.")
-        
+            print(f"{row_count - 10} oldest records deleted from sfvis_cam{station}.")
+
         else:
-            print()
             print(f"Row count in sfvis_cam{station} is {row_count} and that's below the threshold. No deletion required.")
 
     except mysql.connector.Error as e:
         print(f"Error while deleting records from sfvis_cam{station}: {e}")
         connection.rollback()  # Rollback to maintain data integrity
 
-# Function to publish count data to MySQL database (Non-blocking using threading)
-def publish_to_mysql(people_count, station, time_spent, status, previous_status, sfvis, presence_rate, presence_total):
-    def publish():
-        try:
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor()
-            
-            timestamp = datetime.now()
-
-            if not sfvis.isalnum() or not str(station).isdigit():
-                raise ValueError("Invalid table name or station number.")
-
-            # Base SQL queries
-            base_query = (
-                "INSERT INTO {table} "
-                "(Timestamp, WorkStation_Camera, Vision_System, Old_Status, {time_field}New_Status, People_Count, Frame_Rate, Presence_Change_Total, Presence_Change_Rate) "
-                "VALUES (%s, %s, %s, %s, {time_placeholder}%s, %s, %s, %s, %s)"
-            )
-
-            # Adjust query for time_spent
-            if time_spent:
-                time_field = "Period_Status_Last, "
-                time_placeholder = "%s, "
-                data = (timestamp, station, sfvis, previous_status, time_spent, status, people_count, frame_rate, presence_total, presence_rate)
-            else:
-                time_field = ""
-                time_placeholder = ""
-                data = (timestamp, station, sfvis, previous_status, status, people_count, frame_rate, presence_total, presence_rate)
-
-            # Final queries
-            query_sfvis = base_query.format(table=f"sfvis{sfvis}", time_field=time_field, time_placeholder=time_placeholder)
-            query_cam = base_query.format(table=f"sfvis_cam{station}", time_field=time_field, time_placeholder=time_placeholder)
-
-            # Execute queries
-            print()
-            cursor.execute(query_sfvis, data)
-            cursor.execute(query_cam, data)
+# Build both INSERT statements (with and without the duration column) for one
+# (sfvis, station) pair. Called once at startup right after create_table, so
+# the writer thread only ever does dict lookups against a known-good whitelist
+# of table names
+def register_queries(sfvis, station):
+    # Identifiers are constant for the life of the process, so validate them
+    # here once instead of on every row in the writer thread
+    if not str(sfvis).isalnum() or not str(station).isdigit():
+        raise ValueError(f"Invalid table name or station number: sfvis={sfvis!r}, station={station!r}")
+    base_query = (
+        "INSERT INTO {table} "
+        "(Timestamp, WorkStation_Camera, Vision_System, Old_Status, {time_field}New_Status, People_Count, Frame_Rate, Presence_Change_Total, Presence_Change_Rate) "
+        "VALUES (%s, %s, %s, %s, {time_placeholder}%s, %s, %s, %s, %s)"
+    )
+    for has_time in (False, True):
+        time_field = "Period_Status_Last, " if has_time else ""
+        time_placeholder = "%s, " if has_time else ""
+        query_cache[(sfvis, station, has_time)] = (
+            base_query.format(table=f"sfvis{sfvis}", time_field=time_field, time_placeholder=time_placeholder),
+            base_query.format(table=f"sfvis_cam{station}", time_field=time_field, time_placeholder=time_placeholder),
+        )
 
-            connection.commit()
+# Queue feeding the single database writer thread. Bounded so rapid status
+# transitions can never pile up unbounded; when full the oldest pending row
+# is dropped instead of blocking the vision loop.
+db_queue = queue.Queue(maxsize=1000)
 
-            print(f"Published to MySQL: {people_count} people at Cam{station}")
+# Function to publish count data to MySQL database (non-blocking: hands the
+# row to the writer thread instead of spawning a thread per event)
+def publish_to_mysql(people_count, station, time_spent, status, previous_status, sfvis, presence_rate, presence_total):
+    # Timestamp is taken at enqueue time so writer-side batching doesn't
+    # skew the stored times
+    row = (datetime.now(), people_count, station, time_spent, status, previous_status, sfvis, presence_rate, presence_total)
+    try:
+        db_queue.put_nowait(row)
+    except queue.Full:
+        try:
+            db_queue.get_nowait()
+        except queue.Empty:
+            pass
+        db_queue.put_nowait(row)
+
+# Single long-running writer thread: pulls rows off db_queue and inserts them
+# over the pooled connection, so the camera loop never touches the database
+def db_writer_loop():
+    # The writer holds one pooled connection and one prepared cursor for its
+    # whole lifetime — prepared statements live on the cursor, so recreating
+    # it per row would re-PREPARE both INSERTs every event. Both are rebuilt
+    # only after a database error.
+    connection = None
+    cursor = None
+    while True:
+        # Block for the first row, then drain whatever else arrived so a
+        # burst becomes one executemany round-trip per statement instead of
+        # one commit per event
+        rows = [db_queue.get()]
+        try:
+            while len(rows) < 64:
+                rows.append(db_queue.get_nowait())
+        except queue.Empty:
+            pass
 
-            delete_function(cursor, connection, station)
+        try:
+            if connection is None or not connection.is_connected():
+                connection = db_pool.get_connection()
+                cursor = connection.cursor(prepared=True)  # server-side prepared statements
+
+            # Group rows per statement shape; statements were registered at
+            # startup, so this is a pure dict lookup per row
+            batches = {}
+            for (timestamp, people_count, station, time_spent, status,
+                 previous_status, sfvis, presence_rate, presence_total) in rows:
+                if time_spent:
+                    data = (timestamp, station, sfvis, previous_status, time_spent, status, people_count, frame_rate, presence_total, presence_rate)
+                else:
+                    data = (timestamp, station, sfvis, previous_status, status, people_count, frame_rate, presence_total, presence_rate)
+                cache_key = (sfvis, station, bool(time_spent))
+                if cache_key not in query_cache:
+                    register_queries(sfvis, station)
+                batches.setdefault(cache_key, []).append(data)
+
+            for cache_key, batch in batches.items():
+                station = cache_key[1]
+                query_sfvis, query_cam = query_cache[cache_key]
+                cursor.executemany(query_sfvis, batch)
+                cursor.executemany(query_cam, batch)
+                connection.commit()
+                print(f"Published {len(batch)} row(s) to MySQL for Cam{station}")
+                delete_function(cursor, connection, station, inserted=len(batch))
 
         except Error as err:
             print(f"Database error: {err}")
+            try:
+                if connection:
+                    connection.close()  # returns the connection to the pool
+            except Error:
+                pass
+            connection = None
+            cursor = None
         except ValueError as e:
             print(f"Validation error: {e}")
 
-        finally:
-            if connection.is_connected():
-                cursor.close()
-                connection.close()
-
-    # Run the publish function in a separate thread to avoid blocking
-    threading.Thread(target=publish).start()
-
 def check_status(people_count, station, status, time_started, previous_status, sfvis, presence_total, presence_rate):
     time_spent = None
     if status != previous_status: 
@@ -317,6 +477,7 @@ def main():
         return
     
     threading.Thread(target=lambda: app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)).start()
+    threading.Thread(target=db_writer_loop, daemon=True).start()
 
     previous_status1 = "Vacant"
     previous_status2 = "Vacant"
@@ -338,25 +499,44 @@ def main():
     overall_time = time.time()
     checkpoint = None
 
+    # Persistent zero-copy CUDA buffers, allocated on the first frame. Tegra
+    # shares DRAM between host and GPU, so writing into the mapped buffer
+    # replaces the per-frame allocation + full-frame memcpy of cudaFromNumpy
+    cuda_img1 = None
+    cuda_img2 = None
+
     create_table(sfvis, station1)
     create_table(sfvis, station2)
+    register_queries(sfvis, station1)
+    register_queries(sfvis, station2)
 
-    while True:
-        ret1, frame1 = cap1.read()
-        if not ret1:
-            print("Error: Failed to read from the camera 1.")
-            break
+    # Dedicated reader thread per camera so the V4L2 wait inside cap.read()
+    # overlaps with inference instead of serializing with it
+    threading.Thread(target=capture_loop, args=(cap1, 1), daemon=True).start()
+    threading.Thread(target=capture_loop, args=(cap2, 2), daemon=True).start()
 
-        ret2, frame2 = cap2.read()
-        if not ret2:
-            print("Error: Failed to read from the camera 2.")
-            break
-
-        # Convert OpenCV frame to CUDA image
-        cuda_img1 = jetson.utils.cudaFromNumpy(frame1)
-        cuda_img2 = jetson.utils.cudaFromNumpy(frame2)
+    while True:
+        # Snapshot the shared frames once per iteration so the capture threads
+        # can't swap a frame out from under us mid-loop
+        frm1, frm2 = frame1, frame2
+        if frm1 is None or frm2 is None:
+            time.sleep(0.01)  # wait for the capture threads to deliver frames
+            continue
+
+        # Copy the OpenCV frames into the shared CUDA mappings
+        if cuda_img1 is None:
+            cuda_img1 = jetson.utils.cudaAllocMapped(
+                width=frm1.shape[1], height=frm1.shape[0], format='bgr8')
+            cuda_img2 = jetson.utils.cudaAllocMapped(
+                width=frm2.shape[1], height=frm2.shape[0], format='bgr8')
+        np.copyto(jetson.utils.cudaToNumpy(cuda_img1), frm1)
+        np.copyto(jetson.utils.cudaToNumpy(cuda_img2), frm2)
 
         # Run the object detection model
+        # detectNet's Python binding only accepts a single image per Detect()
+        # call, so the two cameras cannot share one batched TensorRT execution;
+        # the calls are kept back-to-back with no CPU work in between so the
+        # second launch queues on the GPU immediately.
         detections1 = model.Detect(cuda_img1)
         detections2 = model.Detect(cuda_img2)
 
@@ -400,7 +580,7 @@ def main():
 
         if checkpoint is not None: 
             testing = time.time() - checkpoint
-            if str(f"{testing:.1f}") == "1.0":
+            if testing >= 1.0:
                 pause = False
                 checkpoint = None
 